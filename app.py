@@ -3,10 +3,24 @@ Barchart Options Dashboard - Streamlit Frontend
 Connects to FastAPI backend for options data scraping.
 """
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 import pandas as pd
+import numpy as np
+import orjson
 import requests
-from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import re
+import threading
+import time
+from datetime import datetime, time as dt_time
+from zoneinfo import ZoneInfo
 import plotly.graph_objects as go
+import plotly.io as pio
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 from plotly.subplots import make_subplots
 
 # Page configuration - MUST be first
@@ -20,11 +34,115 @@ st.set_page_config(
 DEFAULT_API_URL = "http://localhost:8000"
 try:
     API_BASE_URL = st.secrets.get("API_BASE_URL", DEFAULT_API_URL)
-except:
+except (FileNotFoundError, StreamlitAPIException):
     API_BASE_URL = DEFAULT_API_URL
 
+# Bump on changes to the payload shape - keys the fetch cache, which outlives script edits
+APP_VERSION = "1.1.0"
+
+# Options cache lifetime (seconds), applied through a time bucket in the cache key.
+# Chains barely move outside regular trading hours, so cache them much longer then.
+FETCH_TTL_MARKET = 60
+FETCH_TTL_AFTER_HOURS = 3600
+MARKET_TZ = ZoneInfo("America/New_York")
+
+# Serialize figures (including numpy arrays) with orjson instead of stdlib json
+pio.json.config.default_engine = "orjson"
+
+# Chart limits - wide chains (e.g. $SPX) are binned along the strike axis
+MAX_CHART_STRIKES = 500
+CHART_BINS = 250
+WEBGL_STRIKES = 300  # above this, OI bars are drawn with WebGL instead of SVG
+
+# Options table columns sent to the browser as numbers rather than formatted strings
+PRICE_COLUMNS = ["Call Latest", "Call Bid", "Call Ask", "Strike", "Put Latest", "Put Bid", "Put Ask"]
+COUNT_COLUMNS = ["Call Volume", "Call OI", "Put Volume", "Put OI"]
+TABLE_COLUMN_CONFIG = {
+    **{c: st.column_config.NumberColumn(c, format="%.2f") for c in PRICE_COLUMNS},
+    **{c: st.column_config.NumberColumn(c, format="%d") for c in COUNT_COLUMNS},
+}
+
+# Chains kept for ETag revalidation (least recently used dropped first)
+ETAG_STORE_SIZE = 32
+
+# Sidebar quick symbols - prefetched after hours, once the user has fetched a chain
+QUICK_SYMBOLS = ['AAPL', 'TSLA', 'NVDA', 'SPY', 'QQQ', 'AMZN']
+
+
+# Shared resources - cached so they survive Streamlit reruns
+@st.cache_resource
+def get_session():
+    """Pooled HTTP session - keeps connections to the backend alive between calls."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=10,
+        # Connection errors and gateway statuses are retried; read timeouts are not -
+        # a slow scrape would just be started again. A status still failing after
+        # the retries comes back as the response instead of a RetryError.
+        max_retries=Retry(
+            total=2,
+            read=False,
+            backoff_factor=0.5,
+            backoff_jitter=1.0,
+            backoff_max=30,
+            status_forcelist=[502, 503, 504],
+            raise_on_status=False
+        )
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@st.cache_resource
+def get_executor():
+    """Worker pool for long-running backend calls, so the script thread never blocks."""
+    return ThreadPoolExecutor(max_workers=4)
+
+
+@st.cache_resource
+def get_prefetch_executor():
+    """Single worker for cache warming - leaves the backend's other browser (of 2) free for user fetches."""
+    return ThreadPoolExecutor(max_workers=1)
+
+
+@st.cache_resource
+def get_prefetch_state():
+    """(date, ttl_bucket) pairs the quick symbols have already been prefetched for, and the queued tasks."""
+    return {"lock": threading.Lock(), "done": set(), "pending": []}
+
+
+@st.cache_resource
+def get_request_slots():
+    """Caps concurrent /options requests from this process across all sessions and workers."""
+    return threading.BoundedSemaphore(4)
+
+
+@st.cache_resource
+def get_batch_results():
+    """Chains returned by /options/batch, keyed (symbol, date, ttl_bucket), waiting for fetch_options."""
+    return {"lock": threading.Lock(), "seeds": {}}
+
+
+@st.cache_resource
+def get_fetch_stats():
+    """Process-wide fetch_options counters - calls, cache misses and time spent."""
+    return {"lock": threading.Lock(), "calls": 0, "misses": 0, "seconds": 0.0}
+
+
+@st.cache_resource
+def get_etag_store():
+    """Last (ETag, payload) seen per (symbol, date), for conditional /options requests - an LRU of ETAG_STORE_SIZE."""
+    return {"lock": threading.Lock(), "entries": OrderedDict()}
+
+
+SESSION = get_session()
+EXECUTOR = get_executor()
+PREFETCH_EXECUTOR = get_prefetch_executor()
+
 # Barchart-inspired dark theme CSS
-st.markdown("""
+THEME_CSS = """
 <style>
     @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
     
@@ -78,86 +196,345 @@ st.markdown("""
     #MainMenu {visibility: hidden;}
     footer {visibility: hidden;}
 </style>
-""", unsafe_allow_html=True)
+"""
 
 
+@st.cache_resource
+def get_css():
+    """Theme CSS with whitespace collapsed - built once per process."""
+    return re.sub(r"\s+", " ", THEME_CSS).strip()
+
+
+st.markdown(get_css(), unsafe_allow_html=True)
+
+
+@st.cache_data(ttl=10, show_spinner=False)
 def check_api():
-    """Check if API is available."""
+    """Check if API is available (cached briefly so reruns don't re-probe)."""
     try:
-        r = requests.get(f"{API_BASE_URL}/health", timeout=5)
+        r = SESSION.get(f"{API_BASE_URL}/health", timeout=5)
         return r.status_code == 200
-    except:
+    except requests.exceptions.RequestException:
         return False
 
 
-@st.cache_data(ttl=300, show_spinner=False)
+def market_open():
+    """True during US regular trading hours (Mon-Fri 9:30-16:00 ET, holidays ignored)."""
+    now = datetime.now(MARKET_TZ)
+    return now.weekday() < 5 and dt_time(9, 30) <= now.time() < dt_time(16, 0)
+
+
+def current_ttl_bucket():
+    """Cache-key bucket for the fetch TTL - rolls over every FETCH_TTL_MARKET/FETCH_TTL_AFTER_HOURS."""
+    if market_open():
+        return f"rth-{int(time.time() // FETCH_TTL_MARKET)}"
+    return f"ah-{int(time.time() // FETCH_TTL_AFTER_HOURS)}"
+
+
+class FetchError(Exception):
+    """Failed /options call - raised so the fetch cache never stores it."""
+    def __init__(self, error: str, status_code: int):
+        super().__init__(error)
+        self.error = error
+        self.status_code = status_code
+
+
 def fetch_options(symbol: str, date: str):
-    """Fetch options data from API with proper error handling."""
+    """Fetch options data, served from the cache while the TTL bucket is current.
+    
+    The result carries the ``bucket`` it was fetched in.
+    """
+    ttl_bucket = current_ttl_bucket()
+    start = time.perf_counter()
+    try:
+        result = {**fetch_options_cached(symbol, date, APP_VERSION, ttl_bucket), "bucket": ttl_bucket}
+    except FetchError as e:
+        result = {"success": False, "error": e.error, "status_code": e.status_code, "bucket": ttl_bucket}
+    stats = get_fetch_stats()
+    with stats["lock"]:
+        stats["calls"] += 1
+        stats["seconds"] += time.perf_counter() - start
+    return result
+
+
+@st.cache_data(ttl=FETCH_TTL_AFTER_HOURS, max_entries=256, show_spinner=False)
+def fetch_options_cached(symbol: str, date: str, version: str, ttl_bucket: str):
+    """Fetch options data from API with proper error handling.
+    
+    ``version`` and ``ttl_bucket`` only key the cache: a chain expires when the
+    bucket rolls over, and ``ttl`` evicts entries left behind in old buckets.
+    Failures raise FetchError, so they are retried instead of cached.
+    """
+    # Only runs on a cache miss
+    stats = get_fetch_stats()
+    with stats["lock"]:
+        stats["misses"] += 1
+    
+    # Chains already returned by a batch call in this bucket don't need another round trip
+    batch_results = get_batch_results()
+    with batch_results["lock"]:
+        seeded = batch_results["seeds"].pop((symbol, date, ttl_bucket), None)
+    if seeded is not None:
+        return seeded
+    
+    etags = get_etag_store()
+    with etags["lock"]:
+        known = etags["entries"].get((symbol, date))
+    
     try:
-        r = requests.get(
+        with get_request_slots(), SESSION.get(
             f"{API_BASE_URL}/options",
             params={"symbol": symbol, "date": date},
-            timeout=120
-        )
+            headers={"If-None-Match": known[0]} if known else None,
+            timeout=120,
+            stream=True
+        ) as r:
+            body = r.content
+        
+        if r.status_code == 304 and known:
+            with etags["lock"]:
+                if (symbol, date) in etags["entries"]:
+                    etags["entries"].move_to_end((symbol, date))
+            return {"success": True, "data": known[1]}
         if r.status_code == 200:
-            return {"success": True, "data": r.json()}
+            payload = orjson.loads(body)
+            if r.headers.get("ETag"):
+                with etags["lock"]:
+                    etags["entries"][(symbol, date)] = (r.headers["ETag"], payload)
+                    etags["entries"].move_to_end((symbol, date))
+                    while len(etags["entries"]) > ETAG_STORE_SIZE:
+                        etags["entries"].popitem(last=False)
+            return {"success": True, "data": payload}
         else:
             # Parse error detail from API response
             try:
-                error_detail = r.json().get('detail', 'Unknown error occurred')
-            except:
+                error_detail = orjson.loads(body).get('detail', 'Unknown error occurred')
+            except (ValueError, AttributeError):
                 error_detail = f"HTTP {r.status_code}: Server error"
             
-            return {
-                "success": False, 
-                "error": error_detail,
-                "status_code": r.status_code
-            }
+            raise FetchError(error_detail, r.status_code)
+    except FetchError:
+        raise
     except requests.exceptions.Timeout:
-        return {
-            "success": False,
-            "error": "Request timed out. The scraper may be taking too long. Please try again.",
-            "status_code": 408
-        }
+        raise FetchError("Request timed out. The scraper may be taking too long. Please try again.", 408)
     except requests.exceptions.ConnectionError:
-        return {
-            "success": False,
-            "error": "Cannot connect to API server. Make sure the backend is running.",
-            "status_code": 503
-        }
+        raise FetchError("Cannot connect to API server. Make sure the backend is running.", 503)
     except Exception as e:
-        return {
-            "success": False,
-            "error": f"Unexpected error: {str(e)}",
-            "status_code": 500
-        }
+        raise FetchError(f"Unexpected error: {str(e)}", 500)
 
 
-def create_charts(df):
-    """Create visualization charts - bar and line charts for Open Interest."""
-    # Extract numeric values
-    def parse_num(val):
-        if pd.isna(val) or val == "": return 0
-        return float(str(val).replace(",", ""))
+def fetch_options_batch(symbols: list, date: str):
+    """Fetch several chains in one backend call and seed them for fetch_options.
     
-    df["call_oi"] = df["Call OI"].apply(parse_num)
-    df["put_oi"] = df["Put OI"].apply(parse_num)
-    df["strike_num"] = df["Strike"].apply(parse_num)
+    Symbols that fail in the batch are left out and fall back to a single fetch.
+    """
+    try:
+        with get_request_slots(), SESSION.post(
+            f"{API_BASE_URL}/options/batch",
+            json={"symbols": symbols, "date": date},
+            timeout=120 * len(symbols),
+            stream=True
+        ) as r:
+            body = r.content
+        r.raise_for_status()
+        payload = orjson.loads(body)
+    except (requests.exceptions.RequestException, ValueError):
+        return {}
     
+    ttl_bucket = current_ttl_bucket()
+    fetched = {}
+    for s, res in payload.get("results", {}).items():
+        if res.get("success"):
+            fetched[s] = {"success": True, "data": res}
+    
+    # Seeds are only valid in the bucket they were fetched in - drop older ones
+    batch_results = get_batch_results()
+    with batch_results["lock"]:
+        seeds = batch_results["seeds"]
+        for key in [k for k in seeds if k[2] != ttl_bucket]:
+            del seeds[key]
+        seeds.update({(s, date, ttl_bucket): res for s, res in fetched.items()})
+    return fetched
+
+
+def clear_batch_results():
+    """Drop batch chains that fetch_options hasn't picked up yet."""
+    batch_results = get_batch_results()
+    with batch_results["lock"]:
+        batch_results["seeds"].clear()
+
+
+def fetch_batch_then_first(symbols: list, date: str):
+    """Run a batch fetch, then resolve the first symbol through fetch_options."""
+    fetch_options_batch(symbols, date)
+    return fetch_options(symbols[0], date)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def prepare_df(symbol: str, date: str, ttl_bucket: str, _data: list):
+    """Build the options DataFrame once, with numeric columns for the table, charts and metrics.
+    
+    Cached on the chain's (symbol, date, ttl_bucket) - hashing the rows themselves
+    on every rerun costs more than building the frame.
+    """
+    df = pd.DataFrame.from_records(_data)
+    
+    # Extract numeric values (vectorized - "1,234" -> 1234.0, blanks -> NaN).
+    # Arrow-backed strings keep the replace in Arrow's kernel instead of per-object Python calls.
+    def parse_col(col):
+        return pd.to_numeric(
+            df[col].astype("string[pyarrow]").str.replace(",", "", regex=False),
+            errors="coerce"
+        ).astype("float64")
+    
+    parsed = {c: parse_col(c) for c in PRICE_COLUMNS + COUNT_COLUMNS if c in df}
+    
+    def zero_filled(col):
+        return parsed[col].fillna(0.0) if col in parsed else pd.Series(0.0, index=df.index)
+    
+    # Table columns go to the browser as float32 prices and nullable int64 counts
+    # (the same integer width the charts use for OI)
+    table_dtypes = {c: "float32" if c in PRICE_COLUMNS else "Int64" for c in parsed}
+    
+    return df.assign(**parsed).astype(table_dtypes).assign(
+        call_oi=zero_filled("Call OI"),
+        put_oi=zero_filled("Put OI"),
+        strike_num=zero_filled("Strike")
+    )
+
+
+def prefetch_quick_symbols(date: str, loaded: str):
+    """Warm the fetch_options cache for the quick symbols, once per process per TTL bucket.
+    
+    Called after the user's own fetch has finished, so it never takes a backend
+    browser ahead of it. ``loaded`` (the chain just fetched) is skipped. Only runs
+    after hours - market-hours chains expire within a minute, before most would be
+    read - and never while an earlier round is still queued.
+    """
+    if market_open():
+        return
+    ttl_bucket = current_ttl_bucket()
+    key = (date, ttl_bucket)
+    state = get_prefetch_state()
+    with state["lock"]:
+        if key in state["done"] or any(not f.done() for f in state["pending"]):
+            return
+        state["done"] = {k for k in state["done"] if k[1] == ttl_bucket} | {key}
+        state["pending"] = [
+            PREFETCH_EXECUTOR.submit(prefetch_one, s, date, ttl_bucket)
+            for s in QUICK_SYMBOLS if s != loaded
+        ]
+
+
+def prefetch_one(symbol: str, date: str, ttl_bucket: str):
+    """Prefetch task - dropped if its TTL bucket rolled over while it was queued."""
+    if current_ttl_bucket() == ttl_bucket:
+        fetch_options(symbol, date)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def df_csv_bytes(symbol: str, date: str, ttl_bucket: str, _data: list):
+    """CSV export of the raw chain, encoded once per (symbol, date, ttl_bucket) rather than per rerun.
+    
+    Prices and counts are written as raw numbers, unlike the formatted /options/csv
+    export. pyarrow quotes the header and every text cell (including empty ones),
+    which pandas' to_csv doesn't.
+    """
+    table = pa.Table.from_pandas(pd.DataFrame.from_records(_data), preserve_index=False)
+    buf = pa.BufferOutputStream()
+    pa_csv.write_csv(table, buf, pa_csv.WriteOptions(quoting_style="needed"))
+    return buf.getvalue().to_pybytes()
+
+
+def start_fetch(symbol: str, date: str, batch: list = None, refresh: bool = False):
+    """Submit fetch_options to the worker pool, reusing the job for the same query.
+    
+    A running job is always reused. A finished one is kept only while it is
+    current: a chain until its TTL bucket rolls over, a failure until ``refresh``
+    (the Fetch Data button) asks for a retry.
+    
+    When ``batch`` is given, the whole batch is fetched and ``symbol`` (its first
+    entry) is the one displayed.
+    """
+    job = st.session_state.get("fetch_job")
+    if not batch and job is not None and job["key"] == (symbol, date):
+        future = job["future"]
+        if not future.done():
+            return future
+        result = future.result()
+        if not refresh and (not result.get("success") or result.get("bucket") == current_ttl_bucket()):
+            return future
+    
+    if batch:
+        future = EXECUTOR.submit(fetch_batch_then_first, batch, date)
+    else:
+        future = EXECUTOR.submit(fetch_options, symbol, date)
+    st.session_state["fetch_job"] = {"key": (symbol, date), "future": future}
+    return future
+
+
+def select_symbol(symbol: str):
+    """Button callback - put a quick symbol into the Symbol input."""
+    st.session_state["symbol"] = symbol
+
+
+@st.fragment(run_every=1)
+def fetch_status(future, symbol: str, date: str):
+    """Poll the background fetch; only this fragment reruns while waiting."""
+    if future.done():
+        st.rerun()
+    st.status(f"Scraping {symbol} options for {date}... (this may take 30-60 seconds)", state="running")
+
+
+def trim_strike_range(df_sorted):
+    """Drop the far-OTM wings where neither calls nor puts have open interest."""
+    has_oi = ((df_sorted["call_oi"] > 0) | (df_sorted["put_oi"] > 0)).to_numpy()
+    if not has_oi.any():
+        return df_sorted
+    first = has_oi.argmax()
+    last = len(has_oi) - has_oi[::-1].argmax()
+    return df_sorted.iloc[first:last]
+
+
+def downsample_strikes(df_sorted):
+    """Bucket strikes into CHART_BINS bins when the chain is too wide to plot."""
+    if len(df_sorted) <= MAX_CHART_STRIKES:
+        return df_sorted
+    
+    strikes = df_sorted["strike_num"].to_numpy()
+    bins = np.linspace(strikes.min(), strikes.max(), CHART_BINS)
+    bin_idx = np.digitize(strikes, bins)
+    
+    return (
+        df_sorted.groupby(bin_idx)
+        .agg(strike_num=("strike_num", "mean"), call_oi=("call_oi", "sum"), put_oi=("put_oi", "sum"))
+        .reset_index(drop=True)
+    )
+
+
+def create_charts(df):
+    """Create visualization charts - bar and line charts for Open Interest."""
     # Sort by strike for proper line chart display
-    df_sorted = df.sort_values("strike_num")
+    df_sorted = downsample_strikes(trim_strike_range(df.sort_values("strike_num")))
+    
+    # Compact arrays for the browser - float32 strikes, int64 OI (same width as the table's count columns)
+    strikes = df_sorted["strike_num"].to_numpy(np.float32)
+    calls = df_sorted["call_oi"].to_numpy(np.int64)
+    puts = df_sorted["put_oi"].to_numpy(np.int64)
     
     # 1. Bar Chart - Open Interest by Strike (side by side)
     bar_fig = make_subplots(rows=1, cols=2, subplot_titles=('📈 Calls OI (Bar)', '📉 Puts OI (Bar)'))
     
-    bar_fig.add_trace(
-        go.Bar(x=df_sorted['strike_num'], y=df_sorted['call_oi'], name='Calls', marker_color='#00d775'),
-        row=1, col=1
-    )
-    bar_fig.add_trace(
-        go.Bar(x=df_sorted['strike_num'], y=df_sorted['put_oi'], name='Puts', marker_color='#ff4757'),
-        row=1, col=2
-    )
+    def oi_trace(y, name, color):
+        if len(df) > WEBGL_STRIKES:
+            return go.Scattergl(
+                x=strikes, y=y, name=name, mode='markers',
+                marker=dict(symbol='line-ns', size=10, color=color, line=dict(width=2, color=color))
+            )
+        return go.Bar(x=strikes, y=y, name=name, marker_color=color)
+    
+    bar_fig.add_trace(oi_trace(calls, 'Calls', '#00d775'), row=1, col=1)
+    bar_fig.add_trace(oi_trace(puts, 'Puts', '#ff4757'), row=1, col=2)
     
     bar_fig.update_layout(
         template='plotly_dark',
@@ -170,12 +547,13 @@ def create_charts(df):
     bar_fig.update_xaxes(title_text="Strike", gridcolor='#3d4450')
     bar_fig.update_yaxes(title_text="Open Interest", gridcolor='#3d4450')
     
-    # 2. Line Chart - Call & Put OI on same chart
+    # 2. Line Chart - Call & Put OI on same chart (WebGL for wide chains)
     line_fig = go.Figure()
+    line_trace = go.Scattergl if len(df) > WEBGL_STRIKES else go.Scatter
     
-    line_fig.add_trace(go.Scatter(
-        x=df_sorted['strike_num'],
-        y=df_sorted['call_oi'],
+    line_fig.add_trace(line_trace(
+        x=strikes,
+        y=calls,
         mode='lines+markers',
         name='Call OI',
         line=dict(color='#00d775', width=2),
@@ -183,9 +561,9 @@ def create_charts(df):
         hovertemplate='Strike: %{x}<br>Call OI: %{y:,.0f}<extra></extra>'
     ))
     
-    line_fig.add_trace(go.Scatter(
-        x=df_sorted['strike_num'],
-        y=df_sorted['put_oi'],
+    line_fig.add_trace(line_trace(
+        x=strikes,
+        y=puts,
         mode='lines+markers',
         name='Put OI',
         line=dict(color='#ff4757', width=2),
@@ -229,6 +607,150 @@ def create_charts(df):
     return bar_fig, line_fig
 
 
+@st.fragment
+def results_panel(symbol: str, date: str):
+    """Fetch status, options table and charts - reruns on its own for in-panel widgets."""
+    future = start_fetch(symbol, date)
+    if not future.done():
+        fetch_status(future, symbol, date)
+        return
+    result = future.result()
+    
+    # Handle errors
+    if not result.get("success"):
+        error_msg = result.get("error", "Unknown error occurred")
+        status_code = result.get("status_code", 500)
+        
+        # Create user-friendly error display
+        st.error(f"**⚠️ Failed to fetch options data**")
+        
+        # Error details in expander
+        with st.expander("📋 Error Details", expanded=True):
+            st.markdown(f"""
+            **Error:** {error_msg}
+            
+            **Symbol:** `{symbol}` | **Date:** `{date}`
+            """)
+            
+            # Troubleshooting tips based on error type
+            if status_code == 404:
+                st.warning("""
+                **💡 Troubleshooting Tips:**
+                - Verify the stock symbol is correct (e.g., AAPL, TSLA, NVDA)
+                - Check if the expiration date exists for this symbol
+                - For weekly options, use format: `2026-01-10-w`
+                - Visit [Barchart Options](https://www.barchart.com/stocks/quotes/AAPL/options) to verify available dates
+                """)
+            elif status_code == 408:
+                st.warning("""
+                **💡 Troubleshooting Tips:**
+                - The request timed out. This can happen if Barchart is slow.
+                - Try again in a few moments.
+                - Consider trying a different symbol.
+                """)
+            elif status_code == 503:
+                st.warning("""
+                **💡 Troubleshooting Tips:**
+                - Make sure the backend API is running.
+                - Run: `cd backend && python -m uvicorn api:app --port 8000`
+                """)
+            else:
+                st.warning("""
+                **💡 Troubleshooting Tips:**
+                - Check if the API server is running correctly
+                - Look at the backend logs for more details
+                - Try clearing cache and fetching again
+                """)
+            
+            # Clear cache button
+            if st.button("🔄 Clear Cache & Retry"):
+                st.cache_data.clear()
+                clear_batch_results()
+                st.session_state.pop("fetch_job", None)
+                st.rerun()
+    
+    elif result.get("data") and result["data"].get("success"):
+        prefetch_quick_symbols(date, symbol)
+        
+        api_data = result["data"]
+        data = api_data.get("data", [])
+        count = api_data.get("count", len(data))
+        df = prepare_df(symbol, date, result["bucket"], data)
+        table_df = df.drop(columns=["call_oi", "put_oi", "strike_num"])
+        
+        # Info bar
+        st.success(f"✓ Loaded {count} strikes for **{symbol}** expiring **{date}**")
+        
+        # View selector - unlike st.tabs, only the selected view's code runs
+        view = st.radio(
+            "View",
+            ["📋 Options Chain", "📊 Charts"],
+            horizontal=True,
+            label_visibility="collapsed",
+            key="results_view"
+        )
+        
+        if view == "📋 Options Chain":
+            # Table header
+            st.markdown("""
+            <div style="display: flex; margin-bottom: 0;">
+                <div style="flex: 1; background: linear-gradient(90deg, #00875a, #00a86b); color: white; padding: 10px; text-align: center; font-weight: 600; border-radius: 8px 0 0 0;">
+                    📈 CALLS
+                </div>
+                <div style="flex: 0 0 80px; background: #3d4450; color: white; padding: 10px; text-align: center; font-weight: 600;">
+                    STRIKE
+                </div>
+                <div style="flex: 1; background: linear-gradient(90deg, #dc3545, #ff4757); color: white; padding: 10px; text-align: center; font-weight: 600; border-radius: 0 8px 0 0;">
+                    📉 PUTS
+                </div>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            st.data_editor(
+                table_df,
+                disabled=True,
+                column_config=TABLE_COLUMN_CONFIG,
+                use_container_width=True,
+                height=500,
+                hide_index=True
+            )
+            
+            # Download buttons
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button(
+                    "📥 Download CSV",
+                    data=df_csv_bytes(symbol, date, result["bucket"], data),
+                    file_name=f"options_{symbol}_{date}.csv",
+                    mime="text/csv",
+                    use_container_width=True
+                )
+            with col2:
+                st.markdown(f"[📥 Direct API CSV]({API_BASE_URL}/options/csv?symbol={symbol}&date={date})")
+        
+        else:
+            bar_fig, line_fig = create_charts(df)
+            
+            # Line chart first (main comparison chart)
+            st.subheader("📈 Open Interest Comparison")
+            st.plotly_chart(line_fig, use_container_width=True, key="oi_line_chart")
+            
+            # Bar charts below
+            st.subheader("📊 Open Interest Distribution")
+            st.plotly_chart(bar_fig, use_container_width=True, key="oi_bar_chart")
+            
+            # Summary (reuses the numeric columns built by prepare_df)
+            total_call_oi, total_put_oi = (int(v) for v in df[["call_oi", "put_oi"]].to_numpy().sum(axis=0))
+            pc_ratio = total_put_oi / total_call_oi if total_call_oi > 0 else 0
+            
+            st.subheader("📋 Summary Statistics")
+            c1, c2, c3, c4 = st.columns(4)
+            c1.metric("Total Call OI", f"{total_call_oi:,.0f}")
+            c2.metric("Total Put OI", f"{total_put_oi:,.0f}")
+            c3.metric("P/C Ratio", f"{pc_ratio:.3f}")
+            c4.metric("Sentiment", "🐂 Bullish" if pc_ratio < 1 else "🐻 Bearish")
+
+
 def main():
     # Header
     st.markdown("""
@@ -245,7 +767,8 @@ def main():
     with st.sidebar:
         st.markdown("## 🔍 Options Query")
         
-        symbol = st.text_input("Symbol", value="AAPL", help="Stock symbol (e.g., AAPL, TSLA, $SPX)")
+        st.session_state.setdefault("symbol", "AAPL")
+        symbol = st.text_input("Symbol", key="symbol", help="Stock symbol (e.g., AAPL, TSLA, $SPX)")
         symbol = symbol.upper().strip()
         
         date = st.text_input("Expiration Date", value="2026-01-17", help="Format: YYYY-MM-DD or YYYY-MM-DD-w for weekly")
@@ -255,12 +778,21 @@ def main():
         st.markdown("---")
         
         st.markdown("### 🔥 Quick Symbols")
-        popular = ['AAPL', 'TSLA', 'NVDA', 'SPY', 'QQQ', 'AMZN']
         cols = st.columns(3)
-        for i, s in enumerate(popular):
+        quick_btn = False
+        for i, s in enumerate(QUICK_SYMBOLS):
             with cols[i % 3]:
-                if st.button(s, key=f"q_{s}", use_container_width=True):
-                    symbol = s
+                if st.button(s, key=f"q_{s}", use_container_width=True, on_click=select_symbol, args=(s,)):
+                    quick_btn = True
+        
+        batch = st.multiselect("Batch fetch", QUICK_SYMBOLS, help="Fetch several symbols in one backend call")
+        batch_btn = st.button(
+            "📦 Fetch Selected",
+            use_container_width=True,
+            disabled=not api_ok or len(batch) < 2,
+            on_click=select_symbol,
+            args=(batch[0] if batch else symbol,)
+        )
         
         st.markdown("---")
         
@@ -271,6 +803,30 @@ def main():
             st.markdown('<div class="status-error">✗ API Offline</div>', unsafe_allow_html=True)
         
         st.caption(f"Backend: {API_BASE_URL}")
+        
+        if st.button("🔁 Force recheck", use_container_width=True):
+            check_api.clear()
+            st.rerun()
+        
+        if st.button("🗑️ Clear cache", use_container_width=True):
+            fetch_options_cached.clear()
+            prepare_df.clear()
+            df_csv_bytes.clear()
+            clear_batch_results()
+            st.session_state.pop("fetch_job", None)
+            st.rerun()
+        
+        with st.expander("📈 Cache Stats"):
+            stats = get_fetch_stats()
+            with stats["lock"]:
+                calls, misses, seconds = stats["calls"], stats["misses"], stats["seconds"]
+            st.json({
+                "calls": calls,
+                "hits": max(calls - misses, 0),
+                "misses": misses,
+                "hit_rate": round((calls - misses) / calls, 3) if calls else None,
+                "avg_latency_ms": round(seconds / calls * 1000, 1) if calls else None
+            })
     
     # Main content
     if not api_ok:
@@ -285,133 +841,14 @@ def main():
         """)
         return
     
-    if fetch_btn or st.session_state.get("last_fetch"):
+    if fetch_btn or quick_btn or batch_btn or st.session_state.get("last_fetch"):
         st.session_state["last_fetch"] = {"symbol": symbol, "date": date}
         
-        with st.spinner(f"Scraping {symbol} options for {date}... (this may take 30-60 seconds)"):
-            result = fetch_options(symbol, date)
-        
-        # Handle errors
-        if not result.get("success"):
-            error_msg = result.get("error", "Unknown error occurred")
-            status_code = result.get("status_code", 500)
-            
-            # Create user-friendly error display
-            st.error(f"**⚠️ Failed to fetch options data**")
-            
-            # Error details in expander
-            with st.expander("📋 Error Details", expanded=True):
-                st.markdown(f"""
-                **Error:** {error_msg}
-                
-                **Symbol:** `{symbol}` | **Date:** `{date}`
-                """)
-                
-                # Troubleshooting tips based on error type
-                if status_code == 404:
-                    st.warning("""
-                    **💡 Troubleshooting Tips:**
-                    - Verify the stock symbol is correct (e.g., AAPL, TSLA, NVDA)
-                    - Check if the expiration date exists for this symbol
-                    - For weekly options, use format: `2026-01-10-w`
-                    - Visit [Barchart Options](https://www.barchart.com/stocks/quotes/AAPL/options) to verify available dates
-                    """)
-                elif status_code == 408:
-                    st.warning("""
-                    **💡 Troubleshooting Tips:**
-                    - The request timed out. This can happen if Barchart is slow.
-                    - Try again in a few moments.
-                    - Consider trying a different symbol.
-                    """)
-                elif status_code == 503:
-                    st.warning("""
-                    **💡 Troubleshooting Tips:**
-                    - Make sure the backend API is running.
-                    - Run: `cd backend && python -m uvicorn api:app --port 8000`
-                    """)
-                else:
-                    st.warning("""
-                    **💡 Troubleshooting Tips:**
-                    - Check if the API server is running correctly
-                    - Look at the backend logs for more details
-                    - Try clearing cache and fetching again
-                    """)
-                
-                # Clear cache button
-                if st.button("🔄 Clear Cache & Retry"):
-                    st.cache_data.clear()
-                    st.rerun()
-        
-        elif result.get("data") and result["data"].get("success"):
-            api_data = result["data"]
-            data = api_data.get("data", [])
-            count = api_data.get("count", len(data))
-            df = pd.DataFrame(data)
-            
-            # Info bar
-            st.success(f"✓ Loaded {count} strikes for **{symbol}** expiring **{date}**")
-            
-            # Tabs
-            tab1, tab2 = st.tabs(["📋 Options Chain", "📊 Charts"])
-            
-            with tab1:
-                # Table header
-                st.markdown("""
-                <div style="display: flex; margin-bottom: 0;">
-                    <div style="flex: 1; background: linear-gradient(90deg, #00875a, #00a86b); color: white; padding: 10px; text-align: center; font-weight: 600; border-radius: 8px 0 0 0;">
-                        📈 CALLS
-                    </div>
-                    <div style="flex: 0 0 80px; background: #3d4450; color: white; padding: 10px; text-align: center; font-weight: 600;">
-                        STRIKE
-                    </div>
-                    <div style="flex: 1; background: linear-gradient(90deg, #dc3545, #ff4757); color: white; padding: 10px; text-align: center; font-weight: 600; border-radius: 0 8px 0 0;">
-                        📉 PUTS
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                st.dataframe(df, use_container_width=True, height=500, hide_index=True)
-                
-                # Download buttons
-                col1, col2 = st.columns(2)
-                with col1:
-                    csv = df.to_csv(index=False)
-                    st.download_button(
-                        "📥 Download CSV",
-                        data=csv,
-                        file_name=f"options_{symbol}_{date}.csv",
-                        mime="text/csv",
-                        use_container_width=True
-                    )
-                with col2:
-                    st.markdown(f"[📥 Direct API CSV]({API_BASE_URL}/options/csv?symbol={symbol}&date={date})")
-            
-            with tab2:
-                bar_fig, line_fig = create_charts(df)
-                
-                # Line chart first (main comparison chart)
-                st.subheader("📈 Open Interest Comparison")
-                st.plotly_chart(line_fig, use_container_width=True)
-                
-                # Bar charts below
-                st.subheader("📊 Open Interest Distribution")
-                st.plotly_chart(bar_fig, use_container_width=True)
-                
-                # Summary
-                def parse_num(val):
-                    if pd.isna(val) or val == "": return 0
-                    return float(str(val).replace(",", ""))
-                
-                total_call_oi = sum(parse_num(v) for v in df["Call OI"])
-                total_put_oi = sum(parse_num(v) for v in df["Put OI"])
-                pc_ratio = total_put_oi / total_call_oi if total_call_oi > 0 else 0
-                
-                st.subheader("📋 Summary Statistics")
-                c1, c2, c3, c4 = st.columns(4)
-                c1.metric("Total Call OI", f"{total_call_oi:,.0f}")
-                c2.metric("Total Put OI", f"{total_put_oi:,.0f}")
-                c3.metric("P/C Ratio", f"{pc_ratio:.3f}")
-                c4.metric("Sentiment", "🐂 Bullish" if pc_ratio < 1 else "🐻 Bearish")
+        if batch_btn:
+            start_fetch(symbol, date, batch=batch)
+        elif fetch_btn:
+            start_fetch(symbol, date, refresh=True)
+        results_panel(symbol, date)
     
     else:
         st.info("👆 Enter a symbol and date, then click **Fetch Data** to load options chain.")
@@ -7,22 +7,181 @@ Endpoints:
 - /options/csv - Get options data (CSV) with symbol & date
 """
 import asyncio
-import json
+import csv
 import base64
-import re
-from io import StringIO
+import copy
+import hashlib
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-import pandas as pd
+from fastapi.middleware.gzip import GZipMiddleware
+import orjson
+from pydantic import BaseModel
 from pydoll.browser import Chrome
 from pydoll.browser.options import ChromiumOptions
+from pydoll.commands import NetworkCommands
+
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="[%(levelname)s] %(message)s")
+logger = logging.getLogger("barchart_api")
+
+# Browser pool sizing - browsers are launched once and reused across requests
+SCRAPER_POOL_MIN = int(os.getenv("SCRAPER_POOL_MIN", "1"))
+SCRAPER_POOL_MAX = int(os.getenv("SCRAPER_POOL_MAX", "2"))
+SCRAPER_POOL_IDLE_TIMEOUT = float(os.getenv("SCRAPER_POOL_IDLE_TIMEOUT", "300"))
+
+# Seconds a scraped (symbol, date) chain is served from memory (0 disables)
+SCRAPE_CACHE_TTL = float(os.getenv("SCRAPE_CACHE_TTL", "60"))
+
+# Max browsers scraping at once for /options/batch
+BATCH_CONCURRENCY = 2
+
+# Rows per chunk when streaming CSV
+CSV_CHUNK_ROWS = 200
+
+# Page assets and trackers that never affect the intercepted options JSON
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.webp", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.css",
+    "*google-analytics*", "*googletagmanager*", "*doubleclick*", "*facebook*",
+]
+
+
+def build_chrome_options():
+    """Configure Chrome for Docker/Server environment."""
+    options = ChromiumOptions()
+    
+    # Set Chrome binary path explicitly for Docker
+    options.binary_location = "/usr/bin/google-chrome"
+    
+    # REQUIRED for Docker: Run in headless mode
+    options.add_argument("--headless=new")
+    
+    # REQUIRED for Docker: Disable sandbox (needed when running as root)
+    options.add_argument("--no-sandbox")
+    
+    # REQUIRED for Docker: Use /dev/shm workaround
+    options.add_argument("--disable-dev-shm-usage")
+    
+    # Performance and stability flags for Docker
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-software-rasterizer")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-background-networking")
+    options.add_argument("--window-size=1920,1080")
+    
+    # Disable dbus to prevent container errors
+    options.add_argument("--disable-features=dbus")
+    
+    # Anti-detection flags
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+    
+    return options
+
+
+# Built once at import; every launch gets its own deep copy because
+# pydoll adds defaults and a temp --user-data-dir to the options it's given
+CHROME_OPTIONS = build_chrome_options()
+
+
+class BrowserPool:
+    """
+    Process-wide pool of started headless Chrome instances.
+    
+    Each request borrows a browser and scrapes in its own browser context and tab,
+    so the multi-second Chrome launch is paid once instead of per request.
+    """
+    
+    def __init__(self, min_size: int, max_size: int, idle_timeout: float):
+        self.min_size = min_size
+        self.idle_timeout = idle_timeout
+        self._idle = []  # (browser, released_at), most recently used last
+        self._slots = asyncio.Semaphore(max_size)
+    
+    async def _launch(self):
+        options = copy.deepcopy(CHROME_OPTIONS)
+        logger.info("Starting browser (headless mode)...")
+        logger.info("Chrome binary: %s", options.binary_location)
+        browser = Chrome(options=options)
+        await browser.start()
+        return browser
+    
+    async def _discard(self, browser):
+        try:
+            await browser.stop()
+        except Exception as e:
+            logger.warning("Failed to stop browser: %s", e)
+    
+    async def _healthy(self, browser):
+        try:
+            await asyncio.wait_for(browser.get_version(), timeout=5)
+            return True
+        except Exception:
+            return False
+    
+    async def _checkout(self):
+        while self._idle:
+            browser, _ = self._idle.pop()
+            if await self._healthy(browser):
+                return browser
+            logger.warning("Pooled browser is unresponsive, replacing it")
+            await self._discard(browser)
+        return await self._launch()
+    
+    async def _reap(self):
+        # Close browsers idle past the timeout, keeping at least min_size warm
+        now = time.monotonic()
+        while len(self._idle) > self.min_size and now - self._idle[0][1] > self.idle_timeout:
+            browser, _ = self._idle.pop(0)
+            await self._discard(browser)
+    
+    async def start(self):
+        for _ in range(self.min_size):
+            self._idle.append((await self._launch(), time.monotonic()))
+    
+    async def close(self):
+        while self._idle:
+            browser, _ = self._idle.pop()
+            await self._discard(browser)
+    
+    @asynccontextmanager
+    async def browser(self):
+        async with self._slots:
+            browser = await self._checkout()
+            try:
+                yield browser
+            finally:
+                self._idle.append((browser, time.monotonic()))
+                await self._reap()
+
+
+BROWSER_POOL = BrowserPool(SCRAPER_POOL_MIN, SCRAPER_POOL_MAX, SCRAPER_POOL_IDLE_TIMEOUT)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await BROWSER_POOL.start()
+    yield
+    await BROWSER_POOL.close()
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse serialized by orjson (FastAPI's own ORJSONResponse is deprecated)."""
+    def render(self, content):
+        return orjson.dumps(content)
+
 
 app = FastAPI(
     title="Barchart Options API",
     description="API to scrape Barchart options data with symbol and date",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Enable CORS
@@ -34,24 +193,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger JSON/CSV responses
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 
 # --- Helper Functions ---
+# Per-side option columns, in the order _pick returns them
+OPTION_COLUMNS = ["Latest", "Bid", "Ask", "Change", "Volume", "OI", "IV"]
+# Output row schema, in table (and CSV) column order
+CSV_FIELDS = [f"Call {c}" for c in OPTION_COLUMNS] + ["Strike"] + [f"Put {c}" for c in OPTION_COLUMNS]
+# Output columns that carry raw numbers in JSON and get formatted for CSV
+PRICE_FIELDS = {f"{side} {col}" for side in ["Call", "Put"] for col in ["Latest", "Bid", "Ask"]} | {"Strike"}
+COUNT_FIELDS = {f"{side} {col}" for side in ["Call", "Put"] for col in ["Volume", "OI"]}
+
+
+class _StripNonNumeric(dict):
+    """str.translate table deleting every char except digits, '.' and '-'."""
+    def __missing__(self, code):
+        self[code] = None
+        return None
+
+
+_NUMERIC_STRIP = _StripNonNumeric({ord(c): ord(c) for c in "0123456789.-"})
+
+
 def _to_float(val, default=None):
     if val is None: return default
     if isinstance(val, (int, float)): return float(val)
     s = str(val).strip()
     if s in ("", "N/A", "na", "None"): return default
-    s = re.sub(r"[^\d\.\-]", "", s)
+    s = s.translate(_NUMERIC_STRIP)
     if s in ("", "-", "."): return default
     try: return float(s)
     except: return default
 
-def _to_int(val, default=0):
+def _to_int(val, default=None):
     f = _to_float(val, None)
-    return int(round(f)) if f is not None else default
+    if f is not None: return int(round(f))
+    d = _to_float(default)  # raw fallback is truncated, not rounded
+    return int(d) if d is not None else None
 
-def _fmt_price(x): return f"{x:,.2f}" if x is not None else ""
-def _fmt_int(x): return f"{int(x):,}" if x is not None else ""
 def _fmt_iv(val):
     if val is None: return ""
     if isinstance(val, str): return val.strip()
@@ -59,33 +240,62 @@ def _fmt_iv(val):
         return f"{val * 100:.2f}%" if val <= 10 else f"{val:.2f}%"
     return str(val)
 
+# _pick result for a strike with no Call (or no Put)
+_EMPTY_PICK = (None, None, None, "", None, None, "")
+
 def _pick(option_obj):
-    """Extract and format option data."""
+    """Extract option data in OPTION_COLUMNS order - raw numbers for prices and counts, text for Change and IV."""
     if not option_obj: 
-        return {k: "" for k in ["Latest", "Bid", "Ask", "Change", "Volume", "Open Int", "IV", "Last Trade", "raw_trade_time"]}
+        return _EMPTY_PICK
     raw = option_obj.get("raw") or {}
-    latest = _to_float(option_obj.get("lastPrice"), raw.get("lastPrice"))
-    bid = _to_float(option_obj.get("bidPrice"), raw.get("bidPrice"))
-    ask = _to_float(option_obj.get("askPrice"), raw.get("askPrice"))
-    volume = _to_int(option_obj.get("volume"), raw.get("volume"))
-    oi = _to_int(option_obj.get("openInterest"), raw.get("openInterest"))
-    iv_val = option_obj.get("volatility") or raw.get("volatility")
     
-    return {
-        "Latest": _fmt_price(latest),
-        "Bid": _fmt_price(bid),
-        "Ask": _fmt_price(ask),
-        "Change": str(option_obj.get("priceChange") or ""),
-        "Volume": _fmt_int(volume),
-        "Open Int": _fmt_int(oi),
-        "IV": _fmt_iv(iv_val),
-        "Last Trade": str(option_obj.get("tradeTime") or ""),
-        "raw_trade_time": raw.get("tradeTime", 0)
-    }
+    return (
+        _to_float(option_obj.get("lastPrice"), _to_float(raw.get("lastPrice"))),
+        _to_float(option_obj.get("bidPrice"), _to_float(raw.get("bidPrice"))),
+        _to_float(option_obj.get("askPrice"), _to_float(raw.get("askPrice"))),
+        str(option_obj.get("priceChange") or ""),
+        _to_int(option_obj.get("volume"), raw.get("volume")),
+        _to_int(option_obj.get("openInterest"), raw.get("openInterest")),
+        _fmt_iv(option_obj.get("volatility") or raw.get("volatility")),
+    )
+
+
+class _Echo:
+    """File-like sink that returns what csv.writer writes, so rows can be yielded."""
+    def write(self, value): return value
+
+
+def format_row(row):
+    """Presentation copy of a raw option row - "1,234.50" prices, "1,234" counts, blanks for None."""
+    out = {}
+    for key, val in row.items():
+        if val is None:
+            out[key] = ""
+        elif key in PRICE_FIELDS:
+            out[key] = f"{val:,.2f}"
+        elif key in COUNT_FIELDS:
+            out[key] = f"{val:,}"
+        else:
+            out[key] = val
+    return out
+
+
+def iter_csv(rows):
+    """Yield raw ``rows`` (list of dicts) as formatted CSV text, CSV_CHUNK_ROWS lines at a time."""
+    writer = csv.writer(_Echo(), lineterminator="\n")
+    yield writer.writerow(CSV_FIELDS)
+    for start in range(0, len(rows), CSV_CHUNK_ROWS):
+        yield "".join(
+            writer.writerow([row.get(k, "") for k in CSV_FIELDS])
+            for row in map(format_row, rows[start:start + CSV_CHUNK_ROWS])
+        )
 
 
 def process_options_data(opt_json):
-    """Process options JSON data into side-by-side format."""
+    """Process options JSON data into side-by-side format.
+    
+    Prices, strikes and counts stay raw numbers (None when missing); see format_row for display.
+    """
     data = opt_json.get("data", {})
     rows = []
 
@@ -110,37 +320,27 @@ def process_options_data(opt_json):
     for strike_str, items in strike_items.items():
         if not isinstance(items, list):
             items = [items]
-        call_obj = next((i for i in items if i.get("optionType") == "Call"), None)
-        put_obj = next((i for i in items if i.get("optionType") == "Put"), None)
+        # First Call and first Put, in one pass over the items
+        call_obj = put_obj = None
+        for i in items:
+            t = i.get("optionType")
+            if t == "Call":
+                if call_obj is None: call_obj = i
+            elif t == "Put" and put_obj is None:
+                put_obj = i
         
         c = _pick(call_obj)
         p = _pick(put_obj)
-        strike_num = _to_float(strike_str, 0)
+        strike_num = _to_float(strike_str)  # None for keys that don't parse
         
-        row = {
-            "Call Latest": c["Latest"], 
-            "Call Bid": c["Bid"], 
-            "Call Ask": c["Ask"], 
-            "Call Change": c["Change"], 
-            "Call Volume": c["Volume"], 
-            "Call OI": c["Open Int"], 
-            "Call IV": c["IV"],
-            "Strike": f"{strike_num:,.2f}" if strike_num else strike_str,
-            "Put Latest": p["Latest"], 
-            "Put Bid": p["Bid"], 
-            "Put Ask": p["Ask"], 
-            "Put Change": p["Change"], 
-            "Put Volume": p["Volume"], 
-            "Put OI": p["Open Int"], 
-            "Put IV": p["IV"],
-        }
-        rows.append((strike_num, row))
+        row = dict(zip(CSV_FIELDS, (*c, strike_num, *p)))
+        rows.append((strike_num or 0.0, row))
     
     rows.sort(key=lambda x: x[0])
     return [r for _, r in rows]
 
 
-async def scrape_options(symbol: str, date: str):
+async def scrape_options_uncached(symbol: str, date: str):
     """
     Scrape options data from Barchart for the given symbol and date.
     Uses network interception to capture API responses.
@@ -154,10 +354,20 @@ async def scrape_options(symbol: str, date: str):
     """
     # Build URL - use SBS view for side-by-side
     url = f"https://www.barchart.com/stocks/quotes/{symbol}/options?expiration={date}&view=sbs"
-    print(f"[INFO] Scraping: {url}")
+    logger.info("Scraping: %s", url)
     
     # Dictionary to store captured requests
     captured_requests = {}
+    
+    # Set once the options response body has fully arrived
+    options_ready = asyncio.Event()
+    finished_requests = set()
+
+    async def on_loading_finished(event):
+        request_id = event.get("params", {}).get("requestId")
+        finished_requests.add(request_id)
+        if "options" in captured_requests and captured_requests["options"][0] == request_id:
+            options_ready.set()
 
     async def on_response(response_log):
         params = response_log.get("params", {})
@@ -166,113 +376,143 @@ async def scrape_options(symbol: str, date: str):
         
         # Capture Options Data (main table)
         if "/proxies/core-api/v1/options/get" in resp_url and "options" not in captured_requests:
-            print(f"[INFO] Detected Options API call: {resp_url[:80]}...")
+            logger.info("Detected Options API call: %.80s...", resp_url)
             captured_requests["options"] = (params.get("requestId"), resp_url)
+            if params.get("requestId") in finished_requests:
+                options_ready.set()
             
         # Capture Expirations/Volume Data (summary stats)
         elif "/proxies/core-api/v1/options-expirations/get" in resp_url and "expirations" not in captured_requests:
-            print(f"[INFO] Detected Expirations API call: {resp_url[:80]}...")
+            logger.info("Detected Expirations API call: %.80s...", resp_url)
             captured_requests["expirations"] = (params.get("requestId"), resp_url)
 
-    # Configure Chrome for Docker/Server environment
-    options = ChromiumOptions()
-    
-    # Set Chrome binary path explicitly for Docker
-    options.binary_location = "/usr/bin/google-chrome"
-    
-    # REQUIRED for Docker: Run in headless mode
-    options.add_argument("--headless=new")
-    
-    # REQUIRED for Docker: Disable sandbox (needed when running as root)
-    options.add_argument("--no-sandbox")
-    
-    # REQUIRED for Docker: Use /dev/shm workaround
-    options.add_argument("--disable-dev-shm-usage")
-    
-    # Performance and stability flags for Docker
-    options.add_argument("--disable-gpu")
-    options.add_argument("--disable-software-rasterizer")
-    options.add_argument("--disable-extensions")
-    options.add_argument("--disable-background-networking")
-    options.add_argument("--window-size=1920,1080")
-    
-    # Disable dbus to prevent container errors
-    options.add_argument("--disable-features=dbus")
-    
-    # Anti-detection flags
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-    
-    print("[INFO] Starting browser (headless mode)...")
-    print(f"[INFO] Chrome binary: {options.binary_location}")
-    async with Chrome(options=options) as browser:
-        tab = await browser.start()
-        
-        # Enable and listen to network events
-        await tab.enable_network_events()
-        await tab.on("Network.responseReceived", on_response)
-        
-        print(f"[INFO] Navigating to: {url}")
+    async with BROWSER_POOL.browser() as browser:
+        # Fresh browser context per request - isolated cookies/cache, same process
+        context_id = await browser.create_browser_context()
+        tab = None
         try:
-            await tab.go_to(url)
-        except Exception as e:
-            print(f"[ERROR] Navigation error: {e}")
-            raise HTTPException(status_code=500, detail=f"Failed to load page: {str(e)}")
-
-        # Wait for the page to load and API calls to fire (max 25 seconds)
-        print("[INFO] Waiting for network requests (max 25s)...")
-        for i in range(25):
-            await asyncio.sleep(1)
-            # If we've caught the options API, we can stop waiting
-            if "options" in captured_requests:
-                await asyncio.sleep(2)  # Wait a bit more for data to complete
-                break
-            if i % 5 == 0 and i > 0:
-                print(f"[INFO] Waiting... {i}/25 seconds")
-        
-        if "options" not in captured_requests:
-            print("[ERROR] Options API call not captured")
-            raise HTTPException(
-                status_code=404, 
-                detail=f"Options data not found for {symbol} on {date}. Please verify the symbol and expiration date are valid."
-            )
-        
-        # Extract response body
-        request_id, api_url = captured_requests["options"]
-        print(f"[INFO] Processing options data from request {request_id}...")
-        
-        try:
-            # get_network_response_body returns a dict with 'body' and 'base64Encoded'
-            body_data = await tab.get_network_response_body(request_id)
+            tab = await browser.new_tab(browser_context_id=context_id)
             
-            if isinstance(body_data, dict):
-                body = body_data.get("body", "")
-                if body_data.get("base64Encoded"):
-                    body = base64.b64decode(body).decode('utf-8', errors='ignore')
-            else:
-                body = body_data
+            # Enable and listen to network events
+            await tab.enable_network_events()
+            await tab.execute_command(NetworkCommands.set_blocked_urls(BLOCKED_URL_PATTERNS))
+            await tab.on("Network.responseReceived", on_response)
+            await tab.on("Network.loadingFinished", on_loading_finished)
             
-            # Parse JSON
-            opt_json = json.loads(body)
-            rows = process_options_data(opt_json)
+            logger.info("Navigating to: %s", url)
+            try:
+                await tab.go_to(url)
+            except Exception as e:
+                logger.error("Navigation error: %s", e)
+                raise HTTPException(status_code=500, detail=f"Failed to load page: {str(e)}")
+
+            # Wait until the options API response has finished loading (max 25 seconds)
+            logger.info("Waiting for options response (max 25s)...")
+            try:
+                await asyncio.wait_for(options_ready.wait(), timeout=25)
+            except asyncio.TimeoutError:
+                logger.warning("Timed out waiting for options response")
             
-            if not rows:
+            if "options" not in captured_requests:
+                logger.error("Options API call not captured")
                 raise HTTPException(
-                    status_code=404,
-                    detail=f"No options data found for {symbol} on {date}. The expiration date may be invalid."
+                    status_code=404, 
+                    detail=f"Options data not found for {symbol} on {date}. Please verify the symbol and expiration date are valid."
                 )
             
-            print(f"[INFO] Successfully extracted {len(rows)} strikes")
-            return rows
+            # Extract response body
+            request_id, api_url = captured_requests["options"]
+            logger.info("Processing options data from request %s...", request_id)
             
-        except json.JSONDecodeError as e:
-            print(f"[ERROR] JSON parse error: {e}")
-            raise HTTPException(status_code=500, detail=f"Failed to parse options data: {str(e)}")
-        except HTTPException:
-            raise
-        except Exception as e:
-            print(f"[ERROR] Data extraction error: {e}")
-            raise HTTPException(status_code=500, detail=f"Failed to process data: {str(e)}")
+            try:
+                # get_network_response_body returns a dict with 'body' and 'base64Encoded'
+                body_data = await tab.get_network_response_body(request_id)
+            
+                if isinstance(body_data, dict):
+                    body = body_data.get("body", "")
+                    if body_data.get("base64Encoded"):
+                        body = base64.b64decode(body)  # orjson parses the bytes directly
+                else:
+                    body = body_data
+            
+                # Parse and reshape off the event loop - large chains take tens of ms
+                opt_json = await asyncio.to_thread(orjson.loads, body)
+                rows = await asyncio.to_thread(process_options_data, opt_json)
+            
+                if not rows:
+                    raise HTTPException(
+                        status_code=404,
+                        detail=f"No options data found for {symbol} on {date}. The expiration date may be invalid."
+                    )
+            
+                logger.info("Successfully extracted %s strikes", len(rows))
+                return rows
+            
+            except orjson.JSONDecodeError as e:
+                logger.error("JSON parse error: %s", e)
+                raise HTTPException(status_code=500, detail=f"Failed to parse options data: {str(e)}")
+            except HTTPException:
+                raise
+            except Exception as e:
+                logger.error("Data extraction error: %s", e)
+                raise HTTPException(status_code=500, detail=f"Failed to process data: {str(e)}")
+        finally:
+            # Each cleanup step on its own - a crashed tab must not leak the context
+            # or replace the real error
+            if tab is not None:
+                try:
+                    await tab.close()
+                except Exception as e:
+                    logger.warning("Failed to close tab: %s", e)
+            try:
+                await browser.delete_browser_context(context_id)
+            except Exception as e:
+                logger.warning("Failed to delete browser context: %s", e)
+
+
+# Recent scrapes: (symbol, date) -> (monotonic time, rows)
+_scrape_cache = {}
+# One lock per (symbol, date) so concurrent identical requests share one scrape,
+# kept only while requests for that key are in flight
+_scrape_locks = {}
+_scrape_lock_users = {}
+
+
+async def scrape_options(symbol: str, date: str, no_cache: bool = False):
+    """Cached scrape_options_uncached - identical queries within SCRAPE_CACHE_TTL skip the browser."""
+    key = (symbol.upper(), date)
+    
+    def fresh():
+        hit = _scrape_cache.get(key)
+        if hit and time.monotonic() - hit[0] < SCRAPE_CACHE_TTL:
+            return hit[1]
+        return None
+    
+    if not no_cache and (rows := fresh()) is not None:
+        logger.info("Cache hit: %s %s", symbol, date)
+        return rows
+    
+    lock = _scrape_locks.setdefault(key, asyncio.Lock())
+    _scrape_lock_users[key] = _scrape_lock_users.get(key, 0) + 1
+    try:
+        async with lock:
+            # Another request may have scraped this while we waited
+            if not no_cache and (rows := fresh()) is not None:
+                return rows
+            rows = await scrape_options_uncached(symbol, date)
+            
+            now = time.monotonic()
+            for stale in [k for k, (t, _) in _scrape_cache.items() if now - t >= SCRAPE_CACHE_TTL]:
+                del _scrape_cache[stale]
+            if SCRAPE_CACHE_TTL > 0:
+                _scrape_cache[key] = (now, rows)
+            return rows
+    finally:
+        # Drop the lock with its last user, whether or not the scrape succeeded
+        _scrape_lock_users[key] -= 1
+        if not _scrape_lock_users[key]:
+            del _scrape_lock_users[key]
+            del _scrape_locks[key]
 
 
 # --- API Endpoints ---
@@ -286,6 +526,7 @@ async def root():
         "endpoints": {
             "/options": "GET - JSON options data (params: symbol, date)",
             "/options/csv": "GET - CSV download (params: symbol, date)",
+            "/options/batch": "POST - JSON options data for several symbols (body: symbols, date)",
             "/health": "GET - Health check"
         },
         "example": "/options?symbol=AAPL&date=2026-01-17"
@@ -300,49 +541,100 @@ async def health():
 @app.get("/options")
 async def get_options_json(
     symbol: str = Query(..., description="Stock symbol (e.g., AAPL, $SPX, TSLA)"),
-    date: str = Query(..., description="Expiration date (e.g., 2026-01-17)")
+    date: str = Query(..., description="Expiration date (e.g., 2026-01-17)"),
+    no_cache: bool = Query(False, description="Scrape again even if a recent result is cached"),
+    if_none_match: str | None = Header(None)
 ):
     """
     Get options data as JSON.
     
     - **symbol**: Stock symbol (AAPL, TSLA, $SPX, etc.)
     - **date**: Expiration date (2026-01-17 or 2026-01-10-w for weekly)
+    - **no_cache**: Bypass the SCRAPE_CACHE_TTL result cache
     
-    Returns side-by-side Call/Put options data.
+    Returns side-by-side Call/Put options data. The response carries an ETag;
+    clients that send it back in If-None-Match get a bodiless 304 when the
+    chain hasn't changed.
     """
-    rows = await scrape_options(symbol, date)
+    rows = await scrape_options(symbol, date, no_cache)
     
-    return {
+    body = orjson.dumps({
         "success": True,
         "symbol": symbol,
         "date": date,
         "count": len(rows),
         "data": rows
-    }
+    })
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+class BatchRequest(BaseModel):
+    symbols: list[str]
+    date: str
+    no_cache: bool = False
+
+
+@app.post("/options/batch")
+async def get_options_batch(req: BatchRequest):
+    """
+    Get options data for several symbols in one call.
+    
+    - **symbols**: List of stock symbols
+    - **date**: Expiration date shared by all symbols
+    - **no_cache**: Bypass the SCRAPE_CACHE_TTL result cache
+    
+    Each symbol is reported separately, so one bad symbol doesn't fail the batch.
+    Symbols are scraped concurrently, at most BATCH_CONCURRENCY at a time.
+    """
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def scrape_one(symbol):
+        async with semaphore:
+            try:
+                rows = await scrape_options(symbol, req.date, req.no_cache)
+            except HTTPException as e:
+                return {"success": False, "detail": e.detail, "status_code": e.status_code}
+            except Exception as e:
+                # Pool/launch failures too - one bad symbol doesn't fail the batch
+                logger.error("Batch scrape failed for %s: %s", symbol, e)
+                return {"success": False, "detail": f"Scrape failed: {str(e)}", "status_code": 500}
+        return {
+            "success": True,
+            "symbol": symbol,
+            "date": req.date,
+            "count": len(rows),
+            "data": rows
+        }
+    
+    symbols = list(dict.fromkeys(req.symbols))
+    outcomes = await asyncio.gather(*(scrape_one(s) for s in symbols))
+    
+    return {"success": True, "date": req.date, "results": dict(zip(symbols, outcomes))}
 
 
 @app.get("/options/csv")
 async def get_options_csv(
     symbol: str = Query(..., description="Stock symbol (e.g., AAPL, $SPX, TSLA)"),
-    date: str = Query(..., description="Expiration date (e.g., 2026-01-17)")
+    date: str = Query(..., description="Expiration date (e.g., 2026-01-17)"),
+    no_cache: bool = Query(False, description="Scrape again even if a recent result is cached")
 ):
     """
     Get options data as CSV file download.
     
     - **symbol**: Stock symbol (AAPL, TSLA, $SPX, etc.)
     - **date**: Expiration date (2026-01-17 or 2026-01-10-w for weekly)
+    - **no_cache**: Bypass the SCRAPE_CACHE_TTL result cache
     """
-    rows = await scrape_options(symbol, date)
-    
-    df = pd.DataFrame(rows)
-    csv_buffer = StringIO()
-    df.to_csv(csv_buffer, index=False)
-    csv_buffer.seek(0)
+    rows = await scrape_options(symbol, date, no_cache)
     
     filename = f"options_{symbol.replace('$', '')}_{date}.csv"
     
     return StreamingResponse(
-        iter([csv_buffer.getvalue()]),
+        iter_csv(rows),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -350,4 +642,12 @@ async def get_options_csv(
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    
+    # uvloop ships with uvicorn[standard] (not on Windows) - use it when present
+    try:
+        import uvloop  # noqa: F401
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"
+    
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop=loop)
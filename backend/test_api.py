@@ -0,0 +1,276 @@
+"""
+Tests for the options processing helpers.
+
+process_options_data is checked against a copy of the original string-formatting
+implementation on randomized Barchart payloads: format_row applied to the raw
+rows must give back exactly what the original produced.
+
+Run with: pytest backend/test_api.py
+"""
+import asyncio
+import random
+import re
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import HTTPException
+
+import api
+from api import BatchRequest, format_row, get_options_batch, iter_csv, process_options_data, scrape_options_uncached
+
+
+# --- Reference implementation (original, formats everything as strings) ---
+def _ref_to_float(val, default=None):
+    if val is None: return default
+    if isinstance(val, (int, float)): return float(val)
+    s = str(val).strip()
+    if s in ("", "N/A", "na", "None"): return default
+    s = re.sub(r"[^\d\.\-]", "", s)
+    if s in ("", "-", "."): return default
+    try: return float(s)
+    except: return default
+
+def _ref_to_int(val, default=0):
+    f = _ref_to_float(val, None)
+    return int(round(f)) if f is not None else default
+
+def _ref_fmt_price(x): return f"{x:,.2f}" if x is not None else ""
+def _ref_fmt_int(x): return f"{int(x):,}" if x is not None else ""
+def _ref_fmt_iv(val):
+    if val is None: return ""
+    if isinstance(val, str): return val.strip()
+    if isinstance(val, (int, float)):
+        return f"{val * 100:.2f}%" if val <= 10 else f"{val:.2f}%"
+    return str(val)
+
+def _ref_pick(option_obj):
+    if not option_obj:
+        return {k: "" for k in ["Latest", "Bid", "Ask", "Change", "Volume", "Open Int", "IV"]}
+    raw = option_obj.get("raw") or {}
+    return {
+        "Latest": _ref_fmt_price(_ref_to_float(option_obj.get("lastPrice"), raw.get("lastPrice"))),
+        "Bid": _ref_fmt_price(_ref_to_float(option_obj.get("bidPrice"), raw.get("bidPrice"))),
+        "Ask": _ref_fmt_price(_ref_to_float(option_obj.get("askPrice"), raw.get("askPrice"))),
+        "Change": str(option_obj.get("priceChange") or ""),
+        "Volume": _ref_fmt_int(_ref_to_int(option_obj.get("volume"), raw.get("volume"))),
+        "Open Int": _ref_fmt_int(_ref_to_int(option_obj.get("openInterest"), raw.get("openInterest"))),
+        "IV": _ref_fmt_iv(option_obj.get("volatility") or raw.get("volatility")),
+    }
+
+def reference_process(opt_json):
+    data = opt_json.get("data", {})
+    strike_items = {}
+    if isinstance(data, dict):
+        if "Call" in data or "Put" in data:
+            for t in ["Call", "Put"]:
+                for item in data.get(t, []):
+                    strike_items.setdefault(item.get("strikePrice"), []).append(item)
+        else:
+            strike_items = data
+    elif isinstance(data, list):
+        for item in data:
+            strike_items.setdefault(item.get("strikePrice"), []).append(item)
+
+    rows = []
+    for strike_str, items in strike_items.items():
+        if not isinstance(items, list):
+            items = [items]
+        c = _ref_pick(next((i for i in items if i.get("optionType") == "Call"), None))
+        p = _ref_pick(next((i for i in items if i.get("optionType") == "Put"), None))
+        strike_num = _ref_to_float(strike_str, 0)
+        row = {f"Call {k}": c[k] for k in ["Latest", "Bid", "Ask", "Change", "Volume"]}
+        row.update({"Call OI": c["Open Int"], "Call IV": c["IV"]})
+        # The original echoed zero/unparseable strike keys; Strike is now always a number or blank
+        strike = _ref_to_float(strike_str)
+        row["Strike"] = f"{strike:,.2f}" if strike is not None else ""
+        row.update({f"Put {k}": p[k] for k in ["Latest", "Bid", "Ask", "Change", "Volume"]})
+        row.update({"Put OI": p["Open Int"], "Put IV": p["IV"]})
+        rows.append((strike_num, row))
+    rows.sort(key=lambda x: x[0])
+    return [{k: "" if v is None else v for k, v in r.items()} for _, r in rows]
+
+
+# --- Randomized Barchart-like payloads ---
+def _value(rng, kind):
+    r = rng.random()
+    if r < 0.1: return None
+    if r < 0.15: return "N/A"
+    if r < 0.2: return ""
+    if kind == "int":
+        n = rng.randint(0, 5_000_000)
+        return rng.choice([n, f"{n:,}", str(n), float(n) + 0.5])
+    x = round(rng.uniform(0, 5000), rng.choice([0, 1, 2, 3]))
+    return rng.choice([x, f"{x:,.2f}", f"${x:,.2f}", str(x), int(x), "-" + str(x)])
+
+def _option(rng, strike, option_type):
+    item = {"strikePrice": strike, "optionType": option_type}
+    for key, kind in [("lastPrice", "f"), ("bidPrice", "f"), ("askPrice", "f"), ("volume", "int"), ("openInterest", "int")]:
+        if rng.random() < 0.9:
+            item[key] = _value(rng, kind)
+    if rng.random() < 0.8:
+        item["volatility"] = rng.choice([None, 0, 0.25, 25.3, "31.2%", " 12% ", 11])
+    if rng.random() < 0.8:
+        item["priceChange"] = rng.choice([None, 0, "+0.15", -1.2, ""])
+    if rng.random() < 0.6:
+        keys = ["lastPrice", "bidPrice", "askPrice", "volume", "openInterest", "volatility"]
+        item["raw"] = {k: rng.choice([None, 1.5, 2, 100]) for k in keys}
+    return item
+
+def _strike(rng):
+    n = rng.randint(1, 500)
+    return rng.choice([n * 5, f"{n * 5:,.2f}", str(n * 2.5), None, "0", "abc"])
+
+def random_payload(rng):
+    strikes = [_strike(rng) for _ in range(rng.randint(0, 60))]
+    layout = rng.choice(["standard", "sbs", "list"])
+    if layout == "standard":
+        return {"data": {
+            "Call": [_option(rng, s, "Call") for s in strikes if rng.random() < 0.9],
+            "Put": [_option(rng, s, "Put") for s in strikes if rng.random() < 0.9],
+        }}
+    if layout == "sbs":
+        data = {}
+        for s in strikes:
+            types = ["Call", "Put", "Call", "Put", "Other"]
+            items = [_option(rng, s, rng.choice(types)) for _ in range(rng.randint(0, 3))]
+            data[str(s)] = items if rng.random() < 0.9 or not items else items[0]
+        return {"data": data}
+    return {"data": [_option(rng, s, rng.choice(["Call", "Put"])) for s in strikes]}
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_process_options_data_matches_reference(seed):
+    rng = random.Random(seed)
+    for _ in range(50):
+        payload = random_payload(rng)
+        expected = reference_process(payload)
+        assert [format_row(r) for r in process_options_data(payload)] == expected
+
+
+def test_sbs_strike_without_items_keeps_blank_row():
+    rows = process_options_data({"data": {"150.00": [], "155.00": []}})
+    assert [r["Strike"] for r in rows] == [150.0, 155.0]
+    assert all(r["Call Latest"] is None and r["Put IV"] == "" for r in rows)
+
+
+def test_rows_follow_csv_fields():
+    rows = process_options_data({"data": {"Call": [{"strikePrice": "100", "optionType": "Call"}]}})
+    assert list(rows[0]) == api.CSV_FIELDS
+
+
+def test_strike_is_number_or_none():
+    rows = process_options_data({"data": {"abc": [], "0": [], "1,105.00": []}})
+    assert [r["Strike"] for r in rows] == [None, 0.0, 1105.0]
+
+
+def test_raw_numbers_and_csv_formatting():
+    payload = {"data": {"Call": [{"strikePrice": "1,100.00", "optionType": "Call", "lastPrice": "$1.5", "volume": "1,200"}]}}
+    rows = process_options_data(payload)
+    assert rows[0]["Call Latest"] == 1.5
+    assert rows[0]["Call Volume"] == 1200
+    assert rows[0]["Strike"] == 1100.0
+    assert rows[0]["Put Latest"] is None
+    lines = "".join(iter_csv(rows)).splitlines()
+    assert lines[0].startswith("Call Latest,Call Bid")
+    assert lines[1] == '1.50,,,,"1,200",,,"1,100.00",,,,,,,'
+
+
+# --- Scrape cleanup ---
+class _FakeTab:
+    def __init__(self, fail_close):
+        self.fail_close = fail_close
+
+    async def enable_network_events(self): pass
+    async def execute_command(self, command): pass
+    async def on(self, event, callback): pass
+
+    async def go_to(self, url):
+        raise RuntimeError("page crashed")
+
+    async def close(self):
+        if self.fail_close:
+            raise RuntimeError("target closed")
+
+
+class _FakeBrowser:
+    def __init__(self, fail_new_tab=False, fail_close=False):
+        self.fail_new_tab = fail_new_tab
+        self.fail_close = fail_close
+        self.deleted = []
+
+    async def create_browser_context(self):
+        return "ctx-1"
+
+    async def new_tab(self, browser_context_id):
+        if self.fail_new_tab:
+            raise RuntimeError("no tab")
+        return _FakeTab(self.fail_close)
+
+    async def delete_browser_context(self, context_id):
+        self.deleted.append(context_id)
+
+
+def _use_browser(monkeypatch, browser):
+    @asynccontextmanager
+    async def borrow():
+        yield browser
+    monkeypatch.setattr(api.BROWSER_POOL, "browser", borrow)
+
+
+def test_context_deleted_when_new_tab_fails(monkeypatch):
+    browser = _FakeBrowser(fail_new_tab=True)
+    _use_browser(monkeypatch, browser)
+    with pytest.raises(RuntimeError, match="no tab"):
+        asyncio.run(scrape_options_uncached("AAPL", "2026-01-17"))
+    assert browser.deleted == ["ctx-1"]
+
+
+def test_tab_close_failure_keeps_original_error(monkeypatch):
+    browser = _FakeBrowser(fail_close=True)
+    _use_browser(monkeypatch, browser)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(scrape_options_uncached("AAPL", "2026-01-17"))
+    assert "page crashed" in exc.value.detail
+    assert browser.deleted == ["ctx-1"]
+
+
+def test_batch_reports_unexpected_errors_per_symbol(monkeypatch):
+    async def scrape(symbol, date, no_cache=False):
+        if symbol == "BAD":
+            raise RuntimeError("browser launch failed")
+        return [{"Strike": 100.0}]
+    monkeypatch.setattr(api, "scrape_options", scrape)
+    result = asyncio.run(get_options_batch(BatchRequest(symbols=["AAPL", "BAD"], date="2026-01-17")))
+    assert result["results"]["AAPL"]["success"] is True
+    assert result["results"]["BAD"] == {"success": False, "detail": "Scrape failed: browser launch failed", "status_code": 500}
+
+
+# --- Scrape cache locks ---
+def test_scrape_locks_released_after_failures(monkeypatch):
+    async def scrape(symbol, date):
+        await asyncio.sleep(0)
+        raise HTTPException(status_code=404, detail="No data")
+    monkeypatch.setattr(api, "scrape_options_uncached", scrape)
+
+    async def run():
+        for i in range(100):
+            with pytest.raises(HTTPException):
+                await api.scrape_options(f"SYM{i}", "2026-01-17")
+    asyncio.run(run())
+    assert api._scrape_locks == {} and api._scrape_lock_users == {}
+
+
+def test_concurrent_requests_share_one_scrape(monkeypatch):
+    calls = []
+    async def scrape(symbol, date):
+        calls.append(symbol)
+        await asyncio.sleep(0.01)
+        return [{"Strike": 100.0}]
+    monkeypatch.setattr(api, "scrape_options_uncached", scrape)
+    monkeypatch.setattr(api, "_scrape_cache", {})
+
+    async def run():
+        return await asyncio.gather(*(api.scrape_options("AAPL", "2026-01-17") for _ in range(5)))
+    results = asyncio.run(run())
+    assert calls == ["AAPL"] and all(r == [{"Strike": 100.0}] for r in results)
+    assert api._scrape_locks == {}